@@ -1,14 +1,25 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file, g, abort
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, or_, select, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.pool import StaticPool
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, FloatField, IntegerField, SelectField, DateField, PasswordField, BooleanField, TextAreaField
 from wtforms.validators import DataRequired, NumberRange, Email, Length, EqualTo, Optional, ValidationError
 import re
 from werkzeug.security import generate_password_hash, check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
-import json
+from datetime import datetime, date
+from dateutil.relativedelta import relativedelta
+import orjson
+import csv
+import io
 try:
     import pandas as pd
     PANDAS_AVAILABLE = True
@@ -16,7 +27,12 @@ except ImportError:
     PANDAS_AVAILABLE = False
 import os
 import tempfile
-from functools import wraps
+from functools import wraps, lru_cache
+from contextlib import contextmanager
+import threading
+from collections import namedtuple
+import time
+from cachetools import TTLCache
 
 # Application version and metadata
 __version__ = "1.1.0"
@@ -24,7 +40,25 @@ __author__ = "tebwritescode"
 __website__ = "https://tebwrites.code"
 __docker_hub__ = "tebwritescode"
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for jsonify responses and |tojson"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME  # keep Flask's date formatting via default()
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            # orjson has no object_hook, which the session serializer needs
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration from environment variables
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
@@ -33,17 +67,75 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.environ.get('SQLALCHEMY_TRACK_
 app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', '16777216'))  # 16MB default
 
-db = SQLAlchemy(app)
+# Engine configuration - a larger compiled statement cache keeps the many small
+# ORM queries from being recompiled to SQL on every call
+engine_options = {
+    'query_cache_size': 1200,
+    'future': True
+}
+
+# Connection pool configuration - keep gunicorn --threads per worker at or
+# below DB_POOL_SIZE so request threads never queue waiting for a connection
+if app.config['SQLALCHEMY_DATABASE_URI'] in ('sqlite://', 'sqlite:///:memory:'):
+    # In-memory SQLite only exists on a single connection, share it across threads
+    engine_options.update({
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False}
+    })
+else:
+    engine_options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '20')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    })
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+# Keep loaded attributes after commit; nothing here relies on values the database
+# computes on write, so re-selecting rows after every commit is wasted work
+db = SQLAlchemy(app, session_options={'expire_on_commit': False})
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL with relaxed fsyncs and larger caches on every new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA cache_size=-65536')  # 64MB page cache
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')  # 256MB
+    cursor.close()
+
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    with app.app_context():
+        event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+
+# Argon2id hasher for user passwords (legacy Werkzeug hashes are upgraded on login)
+_password_hasher = PasswordHasher()
+
+# Per-employee totals rendered on the analytics page
+SalesData = namedtuple('SalesData', ['name', 'total_revenue', 'total_deals', 'total_commission'])
+
+# Placeholder totals shown behind the login overlay for logged out users
+_DEMO_SALES = (
+    SalesData('Demo User 1', 125000, 45, 6250),
+    SalesData('Demo User 2', 98000, 32, 4900),
+    SalesData('Demo User 3', 156000, 52, 7800)
+)
+
+# Simple email regex pattern, compiled once for all forms
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
 # Custom email validator that only validates when email is provided
 def validate_email_if_present(form, field):
     """Custom validator for optional email fields"""
     if field.data and field.data.strip():
-        # Simple email regex pattern
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, field.data.strip()):
+        if not _EMAIL_RE.match(field.data.strip()):
             raise ValidationError('Invalid email address format')
 
+def strip_whitespace(value):
+    """Form filter that trims surrounding whitespace so blank input stays blank"""
+    return value.strip() if isinstance(value, str) else value
+
 # Custom coerce function for SelectField that handles empty strings
 def coerce_int_or_none(value):
     """Convert value to int, treating empty strings as None/0"""
@@ -56,9 +148,13 @@ def coerce_int_or_none(value):
 
 # Database Models
 class User(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_active_role', 'active', 'role'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    email = db.Column(db.String(100), nullable=True)  # Made optional
+    email = db.Column(db.String(100), unique=True, index=True, nullable=True)  # Optional, unique when set
     password_hash = db.Column(db.String(128), nullable=False)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False) 
@@ -79,10 +175,24 @@ class User(db.Model):
     goals = db.relationship('Goals', backref='user', lazy=True)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify a password, rehashing legacy or outdated hashes (caller commits)"""
+        if self.password_hash.startswith('$argon2'):
+            try:
+                _password_hasher.verify(self.password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+            if _password_hasher.check_needs_rehash(self.password_hash):
+                self.set_password(password)
+            return True
+        
+        # Accounts created before argon2 still carry a Werkzeug PBKDF2/scrypt hash
+        if check_password_hash(self.password_hash, password):
+            self.set_password(password)
+            return True
+        return False
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _password_hasher.hash(password)
     
     def has_permission(self, required_level):
         return self.active and self.permission_level >= required_level
@@ -97,15 +207,29 @@ class User(db.Model):
         return role_map.get(self.role, 'Unknown')
 
 
+def _sale_month_default(context):
+    """Derive the 'YYYY-MM' bucket from the date being inserted"""
+    return context.get_current_parameters()['date'].strftime('%Y-%m')
+
 class Sales(db.Model):
+    __table_args__ = (
+        db.Index('ix_sales_user_date', 'user_id', 'date'),
+        db.Index('ix_sales_date', 'date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     revenue_amount = db.Column(db.Float, nullable=False)
     number_of_deals = db.Column(db.Integer, default=1)
-    commission_earned = db.Column(db.Float, default=0.0)
     draw_payment = db.Column(db.Float, default=0.0)
     period_type = db.Column(db.String(20), default='month')
+    sale_month = db.Column(db.String(7), index=True, default=_sale_month_default)  # 'YYYY-MM', for indexed monthly grouping
+    
+    @property
+    def commission_earned(self):
+        """Commission at the user's current rate (no longer stored per row)"""
+        return calculate_commission(self.revenue_amount, self.user.commission_rate, get_field_toggles())
 
 class Settings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -116,6 +240,10 @@ class Settings(db.Model):
     color_scheme = db.Column(db.String(50), default='default')
 
 class Goals(db.Model):
+    __table_args__ = (
+        db.Index('ix_goals_user_period', 'user_id', 'period_start', 'period_end'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     period_type = db.Column(db.String(20), nullable=False)
@@ -124,6 +252,10 @@ class Goals(db.Model):
     revenue_goal = db.Column(db.Float, default=0.0)
     deals_goal = db.Column(db.Integer, default=0)
 
+# Core tables for read-only aggregate queries that don't need ORM entities
+users_table = User.__table__
+sales_table = Sales.__table__
+
 # Forms
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -139,7 +271,7 @@ class SalesForm(FlaskForm):
 
 class UserProfileForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=50)])
-    email = StringField('Email', validators=[Optional(), validate_email_if_present])
+    email = StringField('Email', validators=[Optional(), validate_email_if_present], filters=[strip_whitespace])
     first_name = StringField('First Name', validators=[DataRequired(), Length(min=1, max=50)])
     last_name = StringField('Last Name', validators=[DataRequired(), Length(min=1, max=50)])
     current_password = PasswordField('Current Password')
@@ -184,7 +316,7 @@ class BulkUploadForm(FlaskForm):
 
 class UserForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=50)])
-    email = StringField('Email', validators=[Optional(), validate_email_if_present])
+    email = StringField('Email', validators=[Optional(), validate_email_if_present], filters=[strip_whitespace])
     first_name = StringField('First Name', validators=[DataRequired(), Length(min=1, max=50)])
     last_name = StringField('Last Name', validators=[DataRequired(), Length(min=1, max=50)])
     role = SelectField('Role', choices=[
@@ -207,7 +339,7 @@ class UserForm(FlaskForm):
 
 class UserEditForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=50)])
-    email = StringField('Email', validators=[Optional(), validate_email_if_present])
+    email = StringField('Email', validators=[Optional(), validate_email_if_present], filters=[strip_whitespace])
     first_name = StringField('First Name', validators=[DataRequired(), Length(min=1, max=50)])
     last_name = StringField('Last Name', validators=[DataRequired(), Length(min=1, max=50)])
     role = SelectField('Role', choices=[
@@ -232,12 +364,93 @@ class NewLoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
     password = PasswordField('Password', validators=[DataRequired()])
 
+# Chart API payloads, keyed by endpoint, parameters and day. Each gunicorn worker
+# has its own copy, so the short TTL bounds staleness across workers.
+_report_cache = TTLCache(maxsize=64, ttl=60)
+_report_cache_lock = threading.Lock()
+
+def invalidate_report_cache():
+    """Drop cached chart data after sales, users or commission settings change"""
+    with _report_cache_lock:
+        _report_cache.clear()
+
+# Detached Settings singleton shared across requests, refreshed every 10 seconds
+_settings_cache = {'obj': None, 'ts': 0}
+
+def get_settings():
+    """Get the Settings row for read-only use (cached across requests)"""
+    if time.monotonic() - _settings_cache['ts'] > 10:
+        settings = Settings.query.first()
+        if settings:
+            # Detach so later commits in this request don't expire the cached copy
+            db.session.expunge(settings)
+        _settings_cache['obj'] = settings
+        _settings_cache['ts'] = time.monotonic()
+    return _settings_cache['obj']
+
+def invalidate_settings_cache():
+    """Force the next get_settings() call to reload the Settings row"""
+    _settings_cache['ts'] = 0
+
 # Helper functions
 def get_current_user():
-    """Get the currently logged in user"""
-    if 'user_id' in session:
-        return User.query.get(session['user_id'])
-    return None
+    """Get the currently logged in user (looked up once per request)"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    if g.get('current_user_id') != user_id:
+        g.current_user = User.query.get(user_id)
+        g.current_user_id = user_id
+    return g.current_user
+
+def username_or_email_taken(username, email, exclude_user_id=None):
+    """Check with a single EXISTS query whether another user has this username or email"""
+    conflict = User.username == username
+    if email:
+        conflict = conflict | (User.email == email)
+    if exclude_user_id is not None:
+        conflict = conflict & (User.id != exclude_user_id)
+    return db.session.query(db.exists().where(conflict)).scalar()
+
+def get_active_employees():
+    """Get (id, first_name, last_name) rows for active employees (looked up once per request)"""
+    if 'active_employees' not in g:
+        g.active_employees = db.session.query(
+            User.id, User.first_name, User.last_name
+        ).filter_by(active=True, role='viewer').order_by(User.last_name, User.first_name).all()
+    return g.active_employees
+
+def find_users_by_name(full_names):
+    """Map CSV employee names ("First Last", or a bare first name) to Users with one query
+
+    Names should already have surrounding whitespace stripped. Duplicate names
+    resolve to the lowest user id; unmatched names are left out.
+    """
+    name_pairs = set()
+    first_names_only = set()
+    for full_name in full_names:
+        name_parts = full_name.split(' ', 1)
+        if len(name_parts) == 2:
+            name_pairs.add(tuple(name_parts))
+        else:
+            first_names_only.add(full_name)
+    
+    conditions = []
+    if name_pairs:
+        conditions.append(tuple_(User.first_name, User.last_name).in_(name_pairs))
+    if first_names_only:
+        conditions.append(User.first_name.in_(first_names_only))
+    if not conditions:
+        return {}
+    
+    users_by_name = {}
+    matches = User.query.options(load_only(User.id, User.first_name, User.last_name))
+    for user in matches.filter(or_(*conditions)).order_by(User.id):
+        if (user.first_name, user.last_name) in name_pairs:
+            users_by_name.setdefault(f"{user.first_name} {user.last_name}", user)
+        if user.first_name in first_names_only:
+            users_by_name.setdefault(user.first_name, user)
+    return users_by_name
 
 def login_required(permission_level=1):
     """Decorator to require login with minimum permission level
@@ -276,24 +489,81 @@ def manager_required(f):
         return f(*args, **kwargs)
     return wrapper
 
-def calculate_commission(revenue, commission_rate, field_toggles):
-    toggles = json.loads(field_toggles) if field_toggles else {}
+@contextmanager
+def count_queries():
+    """Count SQL statements issued inside the block (development aid)
+
+    Listens on every Engine, so it works without an app context:
+
+    with count_queries() as counter:
+        client.get('/data_entry')
+    assert counter['count'] <= 3  # current user, active employees, recent sales
+    """
+    counter = {'count': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+
+@lru_cache(maxsize=4)
+def _parse_toggles(raw_toggles):
+    """Parse the Settings.field_toggles JSON blob (the returned dict is shared, don't mutate it)"""
+    return orjson.loads(raw_toggles) if raw_toggles else {}
+
+def get_field_toggles():
+    """Get the parsed field toggles from the cached Settings row"""
+    settings = get_settings()
+    return _parse_toggles(settings.field_toggles if settings else None)
+
+def calculate_commission(revenue, commission_rate, toggles):
     if toggles.get('commission_display') == 'dollar':
         return commission_rate
     else:
         return revenue * (commission_rate / 100)
 
+def commission_total(toggles):
+    """SQL SUM of commission matching calculate_commission, for queries joining sales to users"""
+    if toggles.get('commission_display') == 'dollar':
+        return db.func.sum(users_table.c.commission_rate)
+    return db.func.sum(sales_table.c.revenue_amount * users_table.c.commission_rate / 100)
+
+def sales_totals_by_user(start_date, end_date, *columns):
+    """Core SELECT of per-user revenue, deals and commission for active users in a date range"""
+    return select(
+        *columns,
+        db.func.sum(sales_table.c.revenue_amount),
+        db.func.sum(sales_table.c.number_of_deals),
+        commission_total(get_field_toggles())
+    ).select_from(
+        users_table.join(sales_table, sales_table.c.user_id == users_table.c.id)
+    ).where(
+        sales_table.c.date >= start_date,
+        sales_table.c.date <= end_date,
+        users_table.c.active == True
+    ).group_by(users_table.c.id)
+
 def get_current_color_scheme():
-    try:
-        settings = Settings.query.first()
-        return settings.color_scheme if settings and settings.color_scheme else 'default'
-    except Exception as e:
-        print(f"Error getting color scheme: {e}")
-        return 'default'
+    """Get the configured color scheme (looked up once per request)"""
+    if 'color_scheme' not in g:
+        try:
+            settings = get_settings()
+            g.color_scheme = settings.color_scheme if settings and settings.color_scheme else 'default'
+        except Exception as e:
+            print(f"Error getting color scheme: {e}")
+            return 'default'
+    return g.color_scheme
 
 def get_period_dates(period_type, custom_start=None, custom_end=None):
-    today = datetime.now().date()
-    
+    return _period_dates_cached(period_type, datetime.now().date(), custom_start, custom_end)
+
+@lru_cache(maxsize=64)
+def _period_dates_cached(period_type, today, custom_start, custom_end):
+    """Period bounds for a given day - keying on today expires entries at midnight"""
     if period_type == 'YTD':
         start_date = datetime(today.year, 1, 1).date()
         end_date = today
@@ -359,11 +629,12 @@ def new_login():
 def login():
     form = LoginForm()
     if form.validate_on_submit():
-        settings = Settings.query.first()
+        settings = get_settings()
         if not settings:
             settings = Settings(admin_password_hash=generate_password_hash('admin'))
             db.session.add(settings)
             db.session.commit()
+            invalidate_settings_cache()
         
         if (form.username.data == settings.admin_username and 
             check_password_hash(settings.admin_password_hash, form.password.data)):
@@ -389,7 +660,11 @@ def test_login():
 @app.route('/management')
 @login_required(3)  # Manager level required
 def management():
-    employees = User.query.filter_by(role='viewer').all()  # Show viewer/employee users
+    # Show viewer/employee users, loading only the columns the page displays
+    employees = User.query.options(load_only(
+        User.id, User.first_name, User.last_name, User.active,
+        User.hire_date, User.commission_rate, User.draw_amount
+    )).filter_by(role='viewer').all()
     return render_template('management.html', employees=employees)
 
 @app.route('/analytics')
@@ -402,36 +677,31 @@ def analytics():
     custom_start = request.args.get('start_date')
     custom_end = request.args.get('end_date')
     
-    if custom_start:
-        custom_start = datetime.strptime(custom_start, '%Y-%m-%d').date()
-    if custom_end:
-        custom_end = datetime.strptime(custom_end, '%Y-%m-%d').date()
+    try:
+        if custom_start:
+            custom_start = date.fromisoformat(custom_start)
+        if custom_end:
+            custom_end = date.fromisoformat(custom_end)
+    except ValueError:
+        abort(400, description='start_date and end_date must be YYYY-MM-DD dates')
     
     start_date, end_date = get_period_dates(period_type, custom_start, custom_end)
     
     # Get sales data for the period (but show demo data if not logged in)
     if is_logged_in:
-        sales_data = db.session.query(
-            (User.first_name + ' ' + User.last_name).label('name'),
-            db.func.sum(Sales.revenue_amount).label('total_revenue'),
-            db.func.sum(Sales.number_of_deals).label('total_deals'),
-            db.func.sum(Sales.commission_earned).label('total_commission')
-        ).join(Sales).filter(
-            Sales.date >= start_date,
-            Sales.date <= end_date,
-            User.active == True
-        ).group_by(User.id).all()
+        rows = db.session.execute(sales_totals_by_user(
+            start_date, end_date, users_table.c.first_name, users_table.c.last_name
+        )).all()
+        # Build display names here rather than concatenating per row in SQL
+        sales_data = [
+            SalesData(f"{first_name} {last_name}", revenue, deals, commission)
+            for first_name, last_name, revenue, deals, commission in rows
+        ]
         
-        employees = User.query.filter_by(active=True, role='viewer').all()  # Only viewer/employee users
+        employees = get_active_employees()  # Only viewer/employee users
     else:
         # Show demo data for logged out users
-        from collections import namedtuple
-        SalesData = namedtuple('SalesData', ['name', 'total_revenue', 'total_deals', 'total_commission'])
-        sales_data = [
-            SalesData('Demo User 1', 125000, 45, 6250),
-            SalesData('Demo User 2', 98000, 32, 4900),
-            SalesData('Demo User 3', 156000, 52, 7800)
-        ]
+        sales_data = _DEMO_SALES
         employees = []
     
     # Create login form for the blur overlay
@@ -454,7 +724,7 @@ def data_entry():
     bulk_form = BulkUploadForm()
     
     # Populate user/employee choices (viewers and above who can have sales data)
-    employees = User.query.filter_by(active=True, role='viewer').all()
+    employees = get_active_employees()
     form.user_id.choices = [(0, 'Select Employee/User')] + [(e.id, f"{e.first_name} {e.last_name}") for e in employees]
     
     if form.validate_on_submit():
@@ -480,28 +750,25 @@ def data_entry():
         number_of_deals = form.number_of_deals.data or 1
         draw_payment = form.draw_payment.data or 0.0
         
-        settings = Settings.query.first()
-        field_toggles = settings.field_toggles if settings else '{}'
-        
-        commission = calculate_commission(revenue_amount, 
-                                        user.commission_rate, 
-                                        field_toggles)
-        
         sale = Sales(
             user_id=form.user_id.data,
             date=date,
             revenue_amount=revenue_amount,
             number_of_deals=number_of_deals,
-            commission_earned=commission,
             draw_payment=draw_payment
         )
         
         db.session.add(sale)
         db.session.commit()
+        invalidate_report_cache()
         flash('Sales data added successfully!', 'success')
         return redirect(url_for('data_entry'))
     
-    recent_sales = Sales.query.join(User).order_by(Sales.date.desc()).limit(10).all()
+    # Load the related users in the same query; the template only reads their
+    # names and commission rate per row
+    recent_sales = Sales.query.options(
+        joinedload(Sales.user).load_only(User.first_name, User.last_name, User.commission_rate)
+    ).order_by(Sales.date.desc()).limit(10).all()
     
     return render_template('data_entry.html', 
                          form=form, 
@@ -531,19 +798,13 @@ def profile():
     
     if form.validate_on_submit():
         # Check if username or email conflicts with other users
-        existing_user = User.query.filter(
-            ((User.username == form.username.data) | 
-             (User.email == form.email.data)) &
-            (User.id != current_user_obj.id)
-        ).first()
-        
-        if existing_user:
+        if username_or_email_taken(form.username.data, form.email.data, current_user_obj.id):
             flash('Username or email already exists for another user', 'error')
             return render_template('profile.html', form=form)
         
         # Update basic profile information
         current_user_obj.username = form.username.data
-        current_user_obj.email = form.email.data
+        current_user_obj.email = form.email.data if form.email.data else None
         current_user_obj.first_name = form.first_name.data
         current_user_obj.last_name = form.last_name.data
         
@@ -567,7 +828,14 @@ def profile():
             current_user_obj.set_password(form.new_password.data)
             flash('Password updated successfully!', 'success')
         
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with another request claiming the same username or email
+            db.session.rollback()
+            flash('Username or email already exists for another user', 'error')
+            return render_template('profile.html', form=form)
+        invalidate_report_cache()
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('profile'))
     
@@ -581,6 +849,7 @@ def settings():
         settings_obj = Settings()
         db.session.add(settings_obj)
         db.session.commit()
+        invalidate_settings_cache()
     
     form = SettingsForm(obj=settings_obj)
     
@@ -591,10 +860,12 @@ def settings():
             'commission_display': form.commission_display.data,
             'draw_display': form.draw_display.data
         }
-        settings_obj.field_toggles = json.dumps(field_toggles)
+        settings_obj.field_toggles = orjson.dumps(field_toggles).decode()
         settings_obj.color_scheme = form.color_scheme.data
         
         db.session.commit()
+        invalidate_settings_cache()
+        invalidate_report_cache()
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('settings'))
     
@@ -604,7 +875,11 @@ def settings():
 @admin_required
 def users():
     """User management page - admin only"""
-    users = User.query.all()
+    # Skip password hashes and employee pay fields the table doesn't show
+    users = User.query.options(load_only(
+        User.id, User.username, User.email, User.first_name, User.last_name,
+        User.role, User.permission_level, User.active, User.last_login, User.created_at
+    )).all()
     return render_template('users.html', users=users)
 
 @app.route('/add_user', methods=['GET', 'POST'])
@@ -616,12 +891,7 @@ def add_user():
     
     if form.validate_on_submit():
         # Check if username or email already exists
-        existing_user = User.query.filter(
-            (User.username == form.username.data) | 
-            (User.email == form.email.data)
-        ).first()
-        
-        if existing_user:
+        if username_or_email_taken(form.username.data, form.email.data):
             flash('Username or email already exists', 'error')
             return render_template('add_user.html', form=form)
         
@@ -649,7 +919,13 @@ def add_user():
         user.set_password(form.password.data)
         
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Username or email already exists', 'error')
+            return render_template('add_user.html', form=form)
+        invalidate_report_cache()
         
         flash(f'User {user.username} created successfully!', 'success')
         return redirect(url_for('users'))
@@ -678,13 +954,7 @@ def edit_user(user_id):
     
     if form.validate_on_submit():
         # Check if username or email conflicts with other users
-        existing_user = User.query.filter(
-            ((User.username == form.username.data) | 
-             (User.email == form.email.data)) &
-            (User.id != user_id)
-        ).first()
-        
-        if existing_user:
+        if username_or_email_taken(form.username.data, form.email.data, user_id):
             flash('Username or email already exists for another user', 'error')
             return render_template('edit_user.html', form=form, user=user)
         
@@ -712,7 +982,13 @@ def edit_user(user_id):
         if form.new_password.data:
             user.set_password(form.new_password.data)
         
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Username or email already exists for another user', 'error')
+            return render_template('edit_user.html', form=form, user=user)
+        invalidate_report_cache()
         flash(f'User {user.username} updated successfully!', 'success')
         return redirect(url_for('users'))
     
@@ -733,6 +1009,7 @@ def delete_user(user_id):
     username = user.username
     db.session.delete(user)
     db.session.commit()
+    invalidate_report_cache()
     
     flash(f'User {username} deleted successfully', 'success')
     return redirect(url_for('users'))
@@ -742,25 +1019,28 @@ def delete_user(user_id):
 def api_sales_data():
     period_type = request.args.get('period', 'YTD')
     
+    cache_key = ('sales_data', period_type, datetime.now().date())
+    with _report_cache_lock:
+        data = _report_cache.get(cache_key)
+    if data is not None:
+        return jsonify(data)
+    
     start_date, end_date = get_period_dates(period_type)
     
-    sales_data = db.session.query(
-        (User.first_name + ' ' + User.last_name).label('name'),
-        db.func.sum(Sales.revenue_amount).label('revenue'),
-        db.func.sum(Sales.number_of_deals).label('deals'),
-        db.func.sum(Sales.commission_earned).label('commission')
-    ).join(Sales).filter(
-        Sales.date >= start_date,
-        Sales.date <= end_date,
-        User.active == True
-    ).group_by(User.id).all()
+    sales_data = db.session.execute(sales_totals_by_user(
+        start_date, end_date, users_table.c.first_name + ' ' + users_table.c.last_name
+    )).all()
     
+    # Transpose rows into columns in one pass; the SUMs already come back as numbers
+    labels, revenue, deals, commission = map(list, zip(*sales_data)) if sales_data else ([], [], [], [])
     data = {
-        'labels': [row.name for row in sales_data],
-        'revenue': [float(row.revenue) for row in sales_data],
-        'deals': [int(row.deals) for row in sales_data],
-        'commission': [float(row.commission) for row in sales_data]
+        'labels': labels,
+        'revenue': revenue,
+        'deals': deals,
+        'commission': commission
     }
+    with _report_cache_lock:
+        _report_cache[cache_key] = data
     
     return jsonify(data)
 
@@ -769,20 +1049,31 @@ def api_sales_data():
 def api_trends_data():
     period_type = request.args.get('period', 'month')
     
-    # Get monthly trends for the past 12 months
-    sales_trends = db.session.query(
-        db.func.strftime('%Y-%m', Sales.date).label('month'),
-        db.func.sum(Sales.revenue_amount).label('revenue'),
-        db.func.sum(Sales.number_of_deals).label('deals')
-    ).filter(
-        Sales.date >= datetime.now().date() - timedelta(days=365)
-    ).group_by(db.func.strftime('%Y-%m', Sales.date)).all()
+    cache_key = ('trends_data', datetime.now().date())
+    with _report_cache_lock:
+        data = _report_cache.get(cache_key)
+    if data is not None:
+        return jsonify(data)
+    
+    # Get monthly trends for the past 12 months (including this one) as a
+    # range scan on the indexed sale_month column
+    cutoff_month = (datetime.now().date().replace(day=1) - relativedelta(months=11)).strftime('%Y-%m')
+    sales_trends = db.session.execute(select(
+        sales_table.c.sale_month,
+        db.func.sum(sales_table.c.revenue_amount),
+        db.func.sum(sales_table.c.number_of_deals)
+    ).where(
+        sales_table.c.sale_month >= cutoff_month
+    ).group_by(sales_table.c.sale_month).order_by(sales_table.c.sale_month)).all()
     
+    labels, revenue, deals = map(list, zip(*sales_trends)) if sales_trends else ([], [], [])
     data = {
-        'labels': [row.month for row in sales_trends],
-        'revenue': [float(row.revenue) for row in sales_trends],
-        'deals': [int(row.deals) for row in sales_trends]
+        'labels': labels,
+        'revenue': revenue,
+        'deals': deals
     }
+    with _report_cache_lock:
+        _report_cache[cache_key] = data
     
     return jsonify(data)
 
@@ -798,48 +1089,131 @@ def bulk_upload():
         file = form.file.data
         if file:
             try:
-                df = pd.read_csv(file)
                 required_columns = ['employee_name', 'date', 'revenue_amount', 'number_of_deals']
+                user_ids = {}
                 
-                if not all(col in df.columns for col in required_columns):
-                    flash('CSV must contain columns: employee_name, date, revenue_amount, number_of_deals', 'error')
-                    return redirect(url_for('data_entry'))
-                
-                settings = Settings.query.first()
-                field_toggles = settings.field_toggles if settings else '{}'
-                
-                for _, row in df.iterrows():
-                    # Try to find user by full name or first/last name combination
-                    full_name = row['employee_name']
-                    name_parts = full_name.split(' ', 1)
-                    if len(name_parts) == 2:
-                        user = User.query.filter_by(first_name=name_parts[0], last_name=name_parts[1]).first()
-                    else:
-                        user = User.query.filter_by(first_name=full_name).first()
-                    
-                    if user:
-                        commission = calculate_commission(row['revenue_amount'], 
-                                                        user.commission_rate, 
-                                                        field_toggles)
+                # Read and insert 10k rows at a time so memory is bounded by one chunk
+                with pd.read_csv(file, chunksize=10000, dtype={'employee_name': str}) as reader:
+                    for df in reader:
+                        if not all(col in df.columns for col in required_columns):
+                            flash('CSV must contain columns: employee_name, date, revenue_amount, number_of_deals', 'error')
+                            return redirect(url_for('data_entry'))
                         
-                        sale = Sales(
-                            user_id=user.id,
-                            date=datetime.strptime(row['date'], '%Y-%m-%d').date(),
-                            revenue_amount=row['revenue_amount'],
-                            number_of_deals=row['number_of_deals'],
-                            commission_earned=commission,
-                            draw_payment=row.get('draw_payment', 0.0)
-                        )
-                        db.session.add(sale)
-                
+                        # Names match with surrounding whitespace ignored, as in bulk_upload_stream;
+                        # blank names become NaN and are skipped with the other unmatched rows
+                        names = df['employee_name'].str.strip()
+                        df['employee_name'] = names.mask(names == '')
+                        
+                        # Resolve employees not seen in earlier chunks with one query
+                        new_names = set(df['employee_name'].dropna()) - user_ids.keys()
+                        if new_names:
+                            found = find_users_by_name(new_names)
+                            user_ids.update({name: found[name].id if name in found else None for name in new_names})
+                        
+                        # draw_payment is optional: default a missing column or blank cells to 0 once
+                        if 'draw_payment' not in df.columns:
+                            df['draw_payment'] = 0.0
+                        df['draw_payment'] = df['draw_payment'].fillna(0.0)
+                        
+                        # Transform whole columns at once, then drop rows with no matching employee
+                        matched_ids = df['employee_name'].map(user_ids)
+                        df = df[matched_ids.notna()]
+                        if df.empty:
+                            continue
+                        dates = pd.to_datetime(df['date'], format='%Y-%m-%d')
+                        sales_df = pd.DataFrame({
+                            'user_id': matched_ids[matched_ids.notna()].astype(int),
+                            'date': dates.dt.date,
+                            'revenue_amount': df['revenue_amount'].astype(float),
+                            'number_of_deals': df['number_of_deals'].astype(int),
+                            'draw_payment': df['draw_payment'].astype(float),
+                            # Filled per column here instead of per row by the column defaults
+                            'period_type': 'month',
+                            'sale_month': dates.dt.strftime('%Y-%m')
+                        })
+                        
+                        # One cached INSERT run with executemany on the session's connection,
+                        # so the whole upload commits or rolls back as one transaction
+                        db.session.execute(sales_table.insert(), sales_df.to_dict('records'))
                 db.session.commit()
+                invalidate_report_cache()
                 flash('Bulk upload completed successfully!', 'success')
                 
             except Exception as e:
+                db.session.rollback()
                 flash(f'Error processing file: {str(e)}', 'error')
     
     return redirect(url_for('data_entry'))
 
+@app.route('/bulk_upload_stream', methods=['POST'])
+@login_required(2)  # User level required
+def bulk_upload_stream():
+    """Import a raw text/csv request body without buffering the whole upload"""
+    if request.mimetype != 'text/csv':
+        return jsonify({'error': 'Request body must be sent as text/csv'}), 415
+    
+    reader = csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8', newline=''))
+    required_columns = ['employee_name', 'date', 'revenue_amount', 'number_of_deals']
+    
+    chunk_size = 500
+    users_by_name = {}
+    inserted = 0
+    skipped = 0
+    
+    def employee_name(row):
+        # DictReader fills fields missing from short rows with None
+        return (row['employee_name'] or '').strip()
+    
+    def insert_chunk(rows):
+        # Look up names not seen in earlier chunks with one query per chunk
+        new_names = {employee_name(row) for row in rows} - users_by_name.keys() - {''}
+        if new_names:
+            found = find_users_by_name(new_names)
+            users_by_name.update({name: found.get(name) for name in new_names})
+        
+        sales_rows = []
+        for row in rows:
+            user = users_by_name.get(employee_name(row))
+            if user:
+                sales_rows.append({
+                    'user_id': user.id,
+                    'date': datetime.strptime(row['date'], '%Y-%m-%d').date(),
+                    'revenue_amount': float(row['revenue_amount']),
+                    'number_of_deals': int(row['number_of_deals']),
+                    'draw_payment': float(row.get('draw_payment') or 0.0)
+                })
+        if sales_rows:
+            db.session.execute(sales_table.insert(), sales_rows)
+        return len(sales_rows), len(rows) - len(sales_rows)
+    
+    try:
+        if not reader.fieldnames or not all(col in reader.fieldnames for col in required_columns):
+            return jsonify({'error': 'CSV must contain columns: employee_name, date, revenue_amount, number_of_deals'}), 400
+        
+        with db.session.no_autoflush:
+            # Insert each full chunk as it arrives so memory stays bounded regardless of upload size
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    chunk_inserted, chunk_skipped = insert_chunk(chunk)
+                    inserted += chunk_inserted
+                    skipped += chunk_skipped
+                    chunk = []
+            
+            if chunk:
+                chunk_inserted, chunk_skipped = insert_chunk(chunk)
+                inserted += chunk_inserted
+                skipped += chunk_skipped
+        
+        db.session.commit()
+        invalidate_report_cache()
+    except (KeyError, TypeError, ValueError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error processing file: {str(e)}'}), 400
+    
+    return jsonify({'success': True, 'inserted': inserted, 'skipped': skipped})
+
 @app.route('/api/save_theme', methods=['POST'])
 @admin_required
 def save_theme():
@@ -857,6 +1231,7 @@ def save_theme():
         if settings:
             settings.color_scheme = theme
             db.session.commit()
+            invalidate_settings_cache()
             return jsonify({'success': True, 'theme': theme})
         else:
             return jsonify({'error': 'Settings not found'}), 404
@@ -869,11 +1244,7 @@ def health_check():
     """Health check endpoint for diagnosing issues"""
     try:
         # Check database connection
-        with app.app_context():
-            db.session.execute(db.text('SELECT 1'))
-            
-        # Check if settings exist
-        settings = Settings.query.first()
+        db.session.execute(db.text('SELECT 1'))
         
         # Basic status available to everyone
         status = {
@@ -881,13 +1252,18 @@ def health_check():
             'version': __version__,
             'author': __author__,
             'website': __website__,
-            'database': 'connected',
-            'settings': 'found' if settings else 'missing'
+            'database': 'connected'
         }
         
-        # Add sensitive information only for authenticated admin users
+        # Frequent anonymous probes stop here; admins and ?deep=1 also check settings
         current_user = get_current_user()
-        if current_user and current_user.has_permission(4):
+        is_admin = current_user and current_user.has_permission(4)
+        if is_admin or request.args.get('deep') == '1':
+            status['settings'] = 'found' if get_settings() else 'missing'
+            status['initialization'] = 'completed' if _db_initialized else 'failed'
+        
+        # Add sensitive information only for authenticated admin users
+        if is_admin:
             status.update({
                 'database_uri': app.config['SQLALCHEMY_DATABASE_URI'],
                 'current_theme': get_current_color_scheme()
@@ -994,14 +1370,38 @@ def init_db():
                             retry_count += 1
                             continue
             
-            # Recreate SQLAlchemy engine with new URI
-            db.engine.dispose()
-            
             with app.app_context():
                 print("Creating database tables...")
                 db.create_all()
                 print("✓ Database tables created")
                 
+                # create_all() skips tables that already exist, so add any columns
+                # and indexes introduced after an existing database was created
+                sales_columns = {column['name'] for column in inspect(db.engine).get_columns('sales')}
+                if 'sale_month' not in sales_columns:
+                    with db.engine.begin() as conn:
+                        conn.execute(db.text('ALTER TABLE sales ADD COLUMN sale_month VARCHAR(7)'))
+                        conn.execute(db.text("UPDATE sales SET sale_month = strftime('%Y-%m', date)"))
+                    print("✓ Added sales.sale_month column")
+                
+                # Older versions saved a blank profile email as '', which would make the
+                # unique email index fail for every database with two such users
+                with db.engine.begin() as conn:
+                    result = conn.execute(users_table.update().where(
+                        db.func.trim(users_table.c.email) == ''
+                    ).values(email=None))
+                if result.rowcount:
+                    print(f"✓ Cleared {result.rowcount} blank user emails")
+                
+                for table in db.metadata.sorted_tables:
+                    for index in table.indexes:
+                        try:
+                            index.create(db.engine, checkfirst=True)
+                        except IntegrityError as e:
+                            # Existing rows violate a unique index (e.g. duplicate emails)
+                            print(f"✗ Could not create index {index.name}: {e}")
+                print("✓ Database indexes verified")
+                
                 # Test database connection
                 print("Testing database connection...")
                 db.session.execute(db.text('SELECT 1'))
@@ -1040,6 +1440,7 @@ def init_db():
                     print("✓ Settings already exist")
                 
                 db.session.commit()
+                invalidate_settings_cache()
                 
                 print("✓ Database initialization completed successfully!")
                 return True
@@ -1060,12 +1461,6 @@ def init_db():
                     # Try in-memory database as last resort
                     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
                     print("Retrying with in-memory database...")
-                
-                # Recreate the database object
-                try:
-                    db.engine.dispose()
-                except:
-                    pass
             else:
                 print("✗ All database initialization attempts failed!")
                 print("The application will continue but may not function properly.")
@@ -1074,32 +1469,16 @@ def init_db():
     
     return False
 
-# Global flag to track database initialization
-_db_initialized = False
-
-def ensure_database():
-    """Ensure database is initialized (thread-safe)"""
-    global _db_initialized
-    if not _db_initialized:
-        try:
-            # Test if database is working
-            with app.app_context():
-                db.session.execute(db.text('SELECT 1'))
-                Settings.query.first()
-                _db_initialized = True
-        except Exception as e:
-            print(f"Database not working, initializing: {e}")
-            if init_db():
-                _db_initialized = True
-
-# Initialize database on startup (only when not running under Gunicorn)
+# Initialize database on startup; /health?deep=1 reports whether it succeeded
 if __name__ == '__main__':
-    init_db()
+    _db_initialized = init_db()
+    app.run(debug=True, host='0.0.0.0', port=5000)
 else:
-    # For Gunicorn, initialize on first request
-    @app.before_request
-    def check_database():
-        ensure_database()
-
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Imported by Gunicorn (or run.py): initialize once here instead of checking
+    # before every request. With --preload this runs once in the master, so drop
+    # its pooled connections rather than sharing them with the forked workers
+    # (except for an in-memory database, which only lives in that connection).
+    with app.app_context():
+        _db_initialized = init_db()
+        if not isinstance(db.engine.pool, StaticPool):
+            db.engine.dispose()
@@ -65,12 +65,13 @@ def test_sqlite_creation():
                 )
             ''')
             
-            # Insert test data
-            cursor.execute("INSERT INTO test_table (name) VALUES (?)", ("test",))
+            # Insert test data in one batched statement
+            cursor.executemany("INSERT INTO test_table (name) VALUES (?)",
+                               [(f"test{i}",) for i in range(1000)])
             conn.commit()
             
             # Read test data
-            cursor.execute("SELECT * FROM test_table")
+            cursor.execute("SELECT COUNT(*), MIN(name), MAX(name) FROM test_table")
             result = cursor.fetchone()
             
             conn.close()
@@ -117,8 +118,17 @@ def create_minimal_database():
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # Create essential tables
+        # Match the app's connection settings: WAL persists in the file, so
+        # the database starts out in the mode the app will use
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        
+        # Create essential tables. executescript() commits anything pending
+        # before it runs, so the BEGIN goes inside the script; the transaction
+        # stays open for the insert below and is committed once at the end.
         cursor.executescript('''
+            BEGIN;
+            
             CREATE TABLE IF NOT EXISTS settings (
                 id INTEGER PRIMARY KEY,
                 default_analytics_period VARCHAR(20) DEFAULT 'YTD',
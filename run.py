@@ -8,12 +8,9 @@ if __name__ == '__main__':
     os.environ.setdefault('FLASK_ENV', 'production')
     os.environ.setdefault('SECRET_KEY', 'your-production-secret-key-change-this')
     
-    # Import and run the app
-    from app import app, init_db
-    
-    # Initialize database if needed
+    # Import and run the app (importing initializes the database)
     print("Initializing database...")
-    init_db()
+    from app import app
     
     # Run the app
     app.run(debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
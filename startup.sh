@@ -7,4 +7,5 @@ mkdir -p /app/data /app/uploads
 
 # Start the application
 echo "Starting Gunicorn..."
-exec gunicorn --bind 0.0.0.0:5000 --workers 4 --timeout 120 app:app
\ No newline at end of file
+# --preload imports the app (and initializes the database) once before forking workers
+exec gunicorn --bind 0.0.0.0:5000 --workers 4 --timeout 120 --preload app:app
\ No newline at end of file